@@ -0,0 +1,179 @@
+"""
+Content-addressed on-disk cache for deterministic phantom regeneration.
+
+Label arrays and parameter maps are stored as plain `.npy` files keyed by
+a hash over the full phantom specification. Hits are memory-mapped.
+
+@jsteb 2024
+"""
+import enum
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import time
+
+import attrs
+import numpy as np
+
+
+# temporary files of writers older than this are considered abandoned
+STALE_TMP_SECONDS = 3600.0
+
+
+def _canonicalize(obj):
+    """
+    Convert the given object into a JSON-serializable canonical form.
+    Handles attrs instances, enums, NumPy scalars and arrays and (named) tuples.
+    Arrays are represented by their dtype, shape and a digest of their contents.
+    """
+    if attrs.has(type(obj)):
+        return {
+            '__type__' : type(obj).__name__,
+            **{field.name : _canonicalize(getattr(obj, field.name))
+               for field in attrs.fields(type(obj))}
+        }
+    if isinstance(obj, enum.Enum):
+        return _canonicalize(obj.value)
+    if isinstance(obj, np.ndarray):
+        array = np.ascontiguousarray(obj)
+        return {
+            '__type__' : 'ndarray',
+            'dtype' : array.dtype.str,
+            'shape' : list(array.shape),
+            'sha256' : hashlib.sha256(array).hexdigest()
+        }
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (list, tuple)):
+        return [_canonicalize(item) for item in obj]
+    if isinstance(obj, dict):
+        return {str(key) : _canonicalize(value) for key, value in obj.items()}
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    raise TypeError(f'cannot canonicalize object of type {type(obj)}')
+
+
+def content_hash(*objects) -> str:
+    """
+    Compute a deterministic SHA-256 hex digest over the canonical
+    JSON representation of the given objects.
+    """
+    canonical = json.dumps([_canonicalize(obj) for obj in objects],
+                           sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+
+@attrs.define
+class PhantomCache:
+    """
+    Size-bounded, content-addressed store of NumPy arrays.
+
+    Every entry is a single `.npy` file named by its key. If the total size
+    exceeds `max_bytes`, the least recently used entries are evicted.
+    """
+    directory: pathlib.Path = attrs.field(converter=pathlib.Path)
+    max_bytes: int = attrs.field(default=2**30)
+
+    @max_bytes.validator
+    def _max_bytes_validator(self, attribute, value):
+        if value <= 0:
+            raise ValueError(f'maximum cache size must be positive (got {value})')
+
+    def __attrs_post_init__(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+
+    def path(self, key: str) -> pathlib.Path:
+        return self.directory / f'{key}.npy'
+
+
+    def load(self, key: str) -> np.ndarray | None:
+        """
+        Return the read-only memory-mapped array for the key or `None`
+        on cache miss.
+        """
+        path = self.path(key)
+        try:
+            array = np.load(path, mmap_mode='r', allow_pickle=False)
+        except (FileNotFoundError, ValueError, EOFError):
+            # missing or truncated entry: treat as miss
+            return None
+        # refresh modification time to mark as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # concurrently evicted: the mapping stays valid
+            pass
+        return array
+
+
+    def store(self, key: str, array: np.ndarray) -> None:
+        """
+        Write the array atomically under the key and evict old entries
+        if the size bound is exceeded.
+        """
+        descriptor, tmppath = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as handle:
+                np.save(handle, np.ascontiguousarray(array), allow_pickle=False)
+            os.replace(tmppath, self.path(key))
+        except BaseException:
+            pathlib.Path(tmppath).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+
+    def _stat(self, pattern: str) -> list[tuple[pathlib.Path, os.stat_result]]:
+        """
+        Stat all files matching the pattern, skipping concurrently removed ones.
+        """
+        stats = []
+        for path in self.directory.glob(pattern):
+            try:
+                stats.append((path, path.stat()))
+            except FileNotFoundError:
+                continue
+        return stats
+
+
+    def evict(self) -> None:
+        """
+        Remove abandoned temporary files and least recently used entries until
+        the total size of the cache is within `max_bytes`.
+        """
+        total = 0
+        threshold = time.time() - STALE_TMP_SECONDS
+        for path, stat in self._stat('*.tmp'):
+            if stat.st_mtime < threshold:
+                path.unlink(missing_ok=True)
+            else:
+                # in-flight writes still occupy disk space
+                total += stat.st_size
+
+        entries = [
+            (stat.st_mtime_ns, path.name, stat.st_size, path)
+            for path, stat in self._stat('*.npy')
+        ]
+        total += sum(entry[2] for entry in entries)
+        # break ties of coarse timestamps deterministically by name
+        for _, _, size, path in sorted(entries, key=lambda e: e[:2]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+    def clear(self) -> None:
+        for path in self.directory.glob('*.npy'):
+            path.unlink(missing_ok=True)
+
+
+    def nbytes(self) -> int:
+        """
+        Total size of all cached entries and temporary files in bytes.
+        """
+        return sum(stat.st_size for pattern in ('*.npy', '*.tmp')
+                   for _, stat in self._stat(pattern))
@@ -7,6 +7,7 @@ from phantom.compartment.compartment import (MagnetizationParams,
                                              CompartmentSpec)
 
 from phantom.stencil import create_circular_positions
+from phantom.profiling import profiled
 
 def int_ID_homogenous(dicts: Iterable[dict]) -> bool:
     """
@@ -31,6 +32,7 @@ def int_ID_are_unique(dicts: Iterable[dict]) -> bool:
 
 
 
+@profiled('compartment.create.from_dicts')
 def from_dicts(canvas_shape: tuple[int, int],
                radius: int,
                morphology: str | Morphology,
@@ -13,6 +13,8 @@ from phantom.compartment.compartment import (Morphology, MagnetizationParams,
                                              compartment_info)
 
 import phantom.compartment.create as compartment_create
+from phantom.cache import PhantomCache, content_hash
+from phantom.profiling import profiled
 from phantom.stencil import create_stencil, create_simple_phantom_mask, add_host_environment_disk
 
 # create some defaults for basal background and host compartment 
@@ -24,6 +26,9 @@ DEFAULT_WATER_MAG = MagnetizationParams(PD=1.0, T1=4000, T2=2000)
 DEFAULT_WATER_LBL = LabelParams(int_ID=-1, name='host-water')
 DEFAULT_WATER = EnvironmentSpec(DEFAULT_WATER_MAG, DEFAULT_WATER_LBL)
 
+# bump if the generation code or the output format changes to invalidate cache entries
+CACHE_VERSION = 1
+
 
 
 def add_integer_label_at_center(ax: axes.Axes,
@@ -71,6 +76,7 @@ class BasicPhantom:
     compartments: list[CompartmentSpec]
     hostmedium: EnvironmentSpec = attrs.field(default=DEFAULT_WATER)
     background: EnvironmentSpec = attrs.field(default=DEFAULT_BACKGROUND)
+    cache: PhantomCache | None = attrs.field(default=None, eq=False, repr=False)
 
 
     def compartments_entirety(self) -> list[CompartmentSpec, EnvironmentSpec]:
@@ -120,12 +126,14 @@ class BasicPhantom:
 
 
     @classmethod
+    @profiled('phantom.BasicPhantom.from_dicts')
     def from_dicts(cls,
                    canvas_shape: tuple[int, int],
                    stencil_radius: int,
                    morphology: str | Morphology,
                    position_radius: int,
-                   specifications: Iterable[dict]
+                   specifications: Iterable[dict],
+                   cache: PhantomCache | None = None
                    ) -> 'BasicPhantom':
         """
         Create the basic phantom from the canvas shape, the morphology and its radius
@@ -151,23 +159,50 @@ class BasicPhantom:
         specifications : Iterable of dict
             Free-form magnetization and label specifications for
             the compartments.
+
+        cache : PhantomCache, optional
+            Content-addressed cache for the label array and parameter maps.
+            On a hit, the array is a read-only memory map. Defaults to `None`.
         """
-        stencil = create_stencil(morphology=morphology, radius=stencil_radius)
         compartments = compartment_create.from_dicts(canvas_shape=canvas_shape,
                                                      radius=position_radius,
                                                      morphology=morphology,
                                                      parameters=specifications)
+        morphology = Morphology(morphology) if isinstance(morphology, str) else morphology
+        if cache is not None:
+            cache_key = content_hash(CACHE_VERSION, 'BasicPhantom.array', tuple(canvas_shape),
+                                     stencil_radius, morphology, position_radius,
+                                     compartments)
+            mask = cache.load(cache_key)
+            if mask is not None:
+                return cls(mask, compartments, cache=cache)
+
+        stencil = create_stencil(morphology=morphology, radius=stencil_radius)
         positions = [c.geometry.center for c in compartments]
         mask = create_simple_phantom_mask(stencil=stencil, canvas_shape=canvas_shape,
                                           positions=positions, odd_preference='post')
         # mask = add_host_environment_disk(mask)
-        return cls(mask, compartments)
+        if cache is not None:
+            cache.store(cache_key, mask)
+        return cls(mask, compartments, cache=cache)
         
 
+    @profiled('phantom.BasicPhantom.map')
     def map(self, parameter: Literal['PD', 'T1', 'T2']) -> np.ndarray:
         """
         Return the requested parameter map.
+        If the phantom carries a cache, maps are keyed by the current array contents
+        and hits are returned as read-only memory maps.
         """
+        map_key = None
+        if self.cache is not None:
+            # key by array contents since the array may be replaced or edited in place
+            map_key = content_hash(CACHE_VERSION, 'BasicPhantom.map', self.array,
+                                   parameter, self.compartments_entirety())
+            parameter_map = self.cache.load(map_key)
+            if parameter_map is not None:
+                return parameter_map
+
         parameter_map = np.full(shape=self.array.shape,
                                 fill_value=np.nan,
                                 dtype=np.float32)
@@ -179,5 +214,8 @@ class BasicPhantom:
 
         if np.any(np.isnan(parameter_map)):
             raise RuntimeError('warp core breach: detected NaN in parameter map')
-        
+
+        if map_key is not None:
+            self.cache.store(map_key, parameter_map)
+
         return parameter_map
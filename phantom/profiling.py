@@ -0,0 +1,218 @@
+"""
+Opt-in stage-level profiling of phantom generation.
+
+Instrumented stages report wall time, peak allocated bytes and call counts
+to the profiler active in the current context (thread or task). Without an
+active profiler, the hooks reduce to a single context variable lookup.
+
+    with profile() as profiler:
+        BasicPhantom.from_dicts(...)
+    print(profiler.to_json())
+
+@jsteb 2024
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import threading
+import time
+import tracemalloc
+import warnings
+
+from typing import Callable, Iterator
+
+import attrs
+
+
+StageCallback = Callable[[str, float, int | None], None]
+
+# profiler of the current context, `None` means instrumentation is disabled
+_ACTIVE: contextvars.ContextVar['Profiler | None'] = contextvars.ContextVar(
+    'phantom_profiler', default=None
+)
+# peak memory frames of the enclosing stages, innermost last
+_FRAMES: contextvars.ContextVar[tuple[list[int], ...]] = contextvars.ContextVar(
+    'phantom_profiler_frames', default=()
+)
+
+# `tracemalloc` is process-wide: reference-count the profilers tracing memory
+# and only stop tracing if it was started by us
+_TRACING_LOCK = threading.Lock()
+_TRACING_USERS = 0
+_TRACING_OWNED = False
+
+
+def _acquire_tracing() -> None:
+    global _TRACING_USERS, _TRACING_OWNED
+    with _TRACING_LOCK:
+        if _TRACING_USERS == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _TRACING_OWNED = True
+        _TRACING_USERS += 1
+
+
+def _release_tracing() -> None:
+    global _TRACING_USERS, _TRACING_OWNED
+    with _TRACING_LOCK:
+        _TRACING_USERS -= 1
+        if _TRACING_USERS == 0 and _TRACING_OWNED:
+            tracemalloc.stop()
+            _TRACING_OWNED = False
+
+
+@attrs.define
+class StageStats:
+    """
+    Aggregated measurements of a single stage.
+    `peak_bytes` is the maximum over all calls of the traced memory peak
+    above the level at stage entry, including freed temporaries.
+    It is `None` if memory was not traced.
+    """
+    calls: int = 0
+    seconds: float = 0.0
+    peak_bytes: int | None = None
+
+    def as_dict(self) -> dict:
+        return {'calls' : self.calls, 'seconds' : self.seconds,
+                'peak_bytes' : self.peak_bytes}
+
+
+
+@attrs.define
+class Profiler:
+    """
+    Collect per-stage measurements.
+
+    Parameters
+    ==========
+
+    trace_memory : bool, optional
+        Record the peak allocated bytes per stage via `tracemalloc`.
+        Adds noticeable overhead, thus defaults to `False`. Note that
+        `tracemalloc` is process-wide and every stage resets its peak:
+        with concurrent threads, peaks are unreliable (too high or too low),
+        and a peak tracked by user code via `tracemalloc` is reset as well.
+
+    callbacks : list of callable, optional
+        Called with `(stage, seconds, peak_bytes)` after every
+        finished stage, `peak_bytes` being `None` if memory is not traced. Exceptions raised by callbacks are reported as
+        warnings and never interrupt the phantom generation.
+    """
+    trace_memory: bool = attrs.field(default=False)
+    callbacks: list[StageCallback] = attrs.field(factory=list)
+    stats: dict[str, StageStats] = attrs.field(factory=dict)
+
+    def register(self, callback: StageCallback) -> None:
+        self.callbacks.append(callback)
+
+
+    def record(self, stage: str, seconds: float, peak_bytes: int | None = None) -> None:
+        stats = self.stats.setdefault(stage, StageStats())
+        stats.calls += 1
+        stats.seconds += seconds
+        if peak_bytes is not None:
+            stats.peak_bytes = max(stats.peak_bytes or 0, peak_bytes)
+        for callback in self.callbacks:
+            try:
+                callback(stage, seconds, peak_bytes)
+            except Exception as exc:
+                warnings.warn(f'profiling callback {callback!r} failed for stage '
+                              f'\'{stage}\': {exc!r}', RuntimeWarning)
+
+
+    def aggregate(self) -> dict[str, dict]:
+        """
+        Return the aggregated measurements as a plain dictionary.
+        """
+        return {stage : stats.as_dict() for stage, stats in self.stats.items()}
+
+
+    def to_json(self, **dumps_kwargs) -> str:
+        return json.dumps(self.aggregate(), **dumps_kwargs)
+
+
+    def reset(self) -> None:
+        self.stats.clear()
+
+
+
+@contextlib.contextmanager
+def profile(profiler: Profiler | None = None, **profiler_kwargs) -> Iterator[Profiler]:
+    """
+    Activate the (newly created) profiler in the current context for the
+    duration of the block. Additional kwargs are passed to the `Profiler`
+    constructor and are mutually exclusive with an explicit `profiler`.
+    """
+    if profiler is not None and profiler_kwargs:
+        raise TypeError('profiler keyword arguments cannot be combined with '
+                        'an explicit profiler instance')
+    profiler = profiler or Profiler(**profiler_kwargs)
+    if profiler.trace_memory:
+        _acquire_tracing()
+    token = _ACTIVE.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _ACTIVE.reset(token)
+        if profiler.trace_memory:
+            _release_tracing()
+
+
+@contextlib.contextmanager
+def _measure(profiler: Profiler, name: str) -> Iterator[None]:
+    trace = profiler.trace_memory and tracemalloc.is_tracing()
+    if trace:
+        frames = _FRAMES.get()
+        current, peak = tracemalloc.get_traced_memory()
+        if frames:
+            # save the enclosing peak before resetting it
+            frames[-1][0] = max(frames[-1][0], peak)
+        frame = [current]
+        frames_token = _FRAMES.set(frames + (frame,))
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        peak_bytes = None
+        if trace:
+            _FRAMES.reset(frames_token)
+            peak = max(tracemalloc.get_traced_memory()[1], frame[0])
+            if frames:
+                # propagate to the enclosing stage since its peak got reset
+                frames[-1][0] = max(frames[-1][0], peak)
+            peak_bytes = peak - current
+        # callback errors are caught in `record` and cannot mask stage errors
+        profiler.record(name, seconds, peak_bytes)
+
+
+_DISABLED = contextlib.nullcontext()
+
+
+def stage(name: str):
+    """
+    Context manager measuring the enclosed block as stage `name`.
+    No-op if no profiler is active.
+    """
+    profiler = _ACTIVE.get()
+    if profiler is None:
+        return _DISABLED
+    return _measure(profiler, name)
+
+
+def profiled(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator measuring every call of the function as stage `name`.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profiler = _ACTIVE.get()
+            if profiler is None:
+                return fn(*args, **kwargs)
+            with _measure(profiler, name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
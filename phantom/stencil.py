@@ -11,6 +11,7 @@ from numbers import Number
 import skimage.morphology as morph
 
 from phantom.position import Position
+from phantom.profiling import profiled, stage
 from phantom.compartment.compartment import Morphology
 
 
@@ -26,6 +27,7 @@ def get_morphology_create_fn(morphology: str | Morphology) -> Callable[[int], np
 
 
 
+@profiled('stencil.create_stencil')
 def create_stencil(morphology: str | Morphology,
                    radius: int) -> np.ndarray:
     morphology = Morphology(morphology) if isinstance(morphology, str) else morphology
@@ -33,6 +35,7 @@ def create_stencil(morphology: str | Morphology,
 
 
 
+@profiled('stencil.create_simple_phantom_mask')
 def create_simple_phantom_mask(
     stencil: np.ndarray,
     canvas_shape: tuple[int, int],
@@ -79,13 +82,15 @@ def create_simple_phantom_mask(
         layer[layer > 0] = i + 2
         layers.append(layer)
 
-    layers = np.stack(layers, axis=0)
-    mask = np.sum(layers, axis=0)
+    with stage('stencil.stack_sum'):
+        layers = np.stack(layers, axis=0)
+        mask = np.sum(layers, axis=0)
 
     if add_host_environment_disk:
-        radius = canvas_shape[0] // 2
-        hostenv = create_stencil(morphology='disk', radius=radius)[:-1, :-1]
-        mask[(mask < 0) & (hostenv > 0)] = -1
+        with stage('stencil.host_disk'):
+            radius = canvas_shape[0] // 2
+            hostenv = create_stencil(morphology='disk', radius=radius)[:-1, :-1]
+            mask[(mask < 0) & (hostenv > 0)] = -1
 
     return mask.astype(dtype)
 
@@ -141,6 +146,7 @@ def create_circular_positions(N: int, /, canvas_shape: Iterable[int], radius: in
     return positions
 
 
+@profiled('stencil.embed_at')
 def embed_at(inlay: np.ndarray, centerpos: Position, canvas_shape: tuple[int],
              odd_preference: Literal['pre', 'post'] = 'post'):
     """
@@ -0,0 +1,121 @@
+import copy
+import io
+import os
+import numpy as np
+
+import pytest
+
+from phantom.cache import PhantomCache, content_hash
+from phantom.phantom import BasicPhantom
+from phantom.position import Position
+
+
+SPECIFICATION = [
+    {'PD' : 1.0, 'T1' : 100, 'T2' : 50},
+    {'PD' : 0.7, 'T1' : 1000, 'T2' : 250},
+    {'PD' : 0.9, 'T1' : 700, 'T2' : 300}
+]
+
+
+def build(cache, specification=None):
+    specification = copy.deepcopy(specification or SPECIFICATION)
+    return BasicPhantom.from_dicts(canvas_shape=(128, 128),
+                                   stencil_radius=8,
+                                   morphology='disk',
+                                   position_radius=30,
+                                   specifications=specification,
+                                   cache=cache)
+
+
+def test_content_hash_is_deterministic():
+    a = content_hash((64, 64), Position(np.int64(3), np.int64(4)), 'disk')
+    b = content_hash((64, 64), Position(3, 4), 'disk')
+    assert a == b
+    assert a != content_hash((64, 64), Position(4, 3), 'disk')
+
+
+def test_cache_hit_returns_memory_map(tmp_path):
+    cache = PhantomCache(tmp_path)
+    first = build(cache)
+    second = build(cache)
+    assert len(list(tmp_path.glob('*.npy'))) == 1
+    assert isinstance(second.array, np.memmap)
+    assert np.array_equal(first.array, second.array)
+
+
+def test_cache_key_depends_on_specification(tmp_path):
+    cache = PhantomCache(tmp_path)
+    first = build(cache)
+    other = copy.deepcopy(SPECIFICATION)
+    other[0]['PD'] = 0.5
+    second = build(cache, other)
+    assert len(list(tmp_path.glob('*.npy'))) == 2
+
+
+def test_cached_parameter_map_matches(tmp_path):
+    cache = PhantomCache(tmp_path)
+    expected = build(None).map('T1')
+    build(cache).map('T1')
+    cached = build(cache).map('T1')
+    assert isinstance(cached, np.memmap)
+    assert np.array_equal(cached, expected)
+
+
+def test_eviction_respects_size_bound(tmp_path):
+    array = np.zeros((32, 32), dtype=np.float32)
+    cache = PhantomCache(tmp_path, max_bytes=3 * array.nbytes)
+    for i in range(6):
+        cache.store(f'key-{i}', array)
+    assert cache.nbytes() <= 3 * array.nbytes
+    assert cache.load('key-5') is not None
+
+
+def test_invalid_max_bytes_raises(tmp_path):
+    with pytest.raises(ValueError):
+        PhantomCache(tmp_path, max_bytes=0)
+
+
+def test_parameter_map_recomputed_after_array_replacement(tmp_path):
+    cache = PhantomCache(tmp_path)
+    phantom = build(cache)
+    phantom.map('PD')
+    phantom.array = np.full((128, 128), -2, dtype=np.int32)
+    assert np.array_equal(np.unique(phantom.map('PD')), [0.0])
+
+
+def test_content_hash_depends_on_array_contents():
+    array = np.zeros((4, 4), dtype=np.int32)
+    key = content_hash(array)
+    array[0, 0] = 1
+    assert content_hash(array) != key
+
+
+def test_load_refreshes_entry_for_lru_eviction(tmp_path):
+    array = np.zeros((32, 32), dtype=np.float32)
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    cache = PhantomCache(tmp_path, max_bytes=3 * buffer.tell())
+    for i in range(3):
+        cache.store(f'key-{i}', array)
+        # explicit distinct timestamps independent of filesystem resolution
+        os.utime(cache.path(f'key-{i}'), ns=(i * 10**9, i * 10**9))
+
+    assert cache.load('key-0') is not None
+    cache.store('key-3', array)
+    assert not cache.path('key-1').exists()
+    assert cache.path('key-0').exists()
+    assert cache.path('key-2').exists()
+
+
+def test_stale_temporary_files_are_removed(tmp_path):
+    cache = PhantomCache(tmp_path)
+    stale = tmp_path / 'abandoned.tmp'
+    fresh = tmp_path / 'inflight.tmp'
+    stale.write_bytes(b'x' * 64)
+    fresh.write_bytes(b'x' * 32)
+    os.utime(stale, (0, 0))
+    assert cache.nbytes() == 96
+    cache.evict()
+    assert not stale.exists()
+    assert fresh.exists()
+    assert cache.nbytes() == 32
@@ -0,0 +1,155 @@
+import json
+import threading
+import tracemalloc
+
+import numpy as np
+
+import pytest
+
+from phantom.phantom import BasicPhantom
+from phantom.profiling import Profiler, profile, stage
+
+
+def build():
+    specification = [
+        {'PD' : 1.0, 'T1' : 100, 'T2' : 50},
+        {'PD' : 0.7, 'T1' : 1000, 'T2' : 250},
+        {'PD' : 0.9, 'T1' : 700, 'T2' : 300}
+    ]
+    return BasicPhantom.from_dicts(canvas_shape=(128, 128),
+                                   stencil_radius=8,
+                                   morphology='disk',
+                                   position_radius=30,
+                                   specifications=specification)
+
+
+def test_stages_are_recorded():
+    with profile() as profiler:
+        phantom = build()
+        phantom.map('PD')
+
+    stats = profiler.aggregate()
+    assert stats['stencil.embed_at']['calls'] == 3
+    assert stats['phantom.BasicPhantom.map']['calls'] == 1
+    for name in ('stencil.create_stencil', 'stencil.stack_sum', 'stencil.host_disk',
+                 'compartment.create.from_dicts', 'phantom.BasicPhantom.from_dicts'):
+        assert stats[name]['calls'] >= 1
+        assert stats[name]['seconds'] >= 0.0
+    assert json.loads(profiler.to_json()) == stats
+
+
+def test_untraced_memory_is_reported_as_none():
+    received = []
+    with profile(callbacks=[lambda *args: received.append(args)]) as profiler:
+        with stage('untraced'):
+            pass
+
+    assert profiler.aggregate()['untraced']['peak_bytes'] is None
+    assert json.loads(profiler.to_json())['untraced']['peak_bytes'] is None
+    assert received[0][2] is None
+
+
+def test_nothing_recorded_outside_of_context():
+    profiler = Profiler()
+    with profile(profiler):
+        pass
+    build()
+    assert profiler.aggregate() == {}
+
+
+def test_trace_memory_and_callbacks():
+    received = []
+    with profile(trace_memory=True, callbacks=[lambda *args: received.append(args)]) as profiler:
+        with stage('allocate'):
+            array = np.ones(2**16, dtype=np.float64)
+
+    stats = profiler.aggregate()['allocate']
+    assert stats['peak_bytes'] >= array.nbytes
+    assert received[0][0] == 'allocate'
+
+
+def test_peak_includes_freed_temporaries_and_nested_stages():
+    nbytes = 8 * 2**16
+    with profile(trace_memory=True) as profiler:
+        with stage('outer'):
+            with stage('inner'):
+                temporary = np.ones(2**16, dtype=np.float64)
+                del temporary
+            with stage('after'):
+                pass
+
+    stats = profiler.aggregate()
+    assert stats['inner']['peak_bytes'] >= nbytes
+    assert stats['outer']['peak_bytes'] >= stats['inner']['peak_bytes']
+    assert stats['after']['peak_bytes'] < nbytes
+
+
+def test_failing_callback_does_not_interrupt_generation():
+    def callback(*args):
+        raise RuntimeError('monitoring glitch')
+
+    with profile(callbacks=[callback]) as profiler:
+        with pytest.warns(RuntimeWarning):
+            build()
+    assert profiler.aggregate()['stencil.embed_at']['calls'] == 3
+
+
+def test_failing_callback_does_not_mask_stage_error():
+    def callback(*args):
+        raise RuntimeError('monitoring glitch')
+
+    with profile(callbacks=[callback]):
+        with pytest.warns(RuntimeWarning), pytest.raises(KeyError):
+            with stage('failing'):
+                raise KeyError('stage error')
+
+
+def test_profiler_is_local_to_thread():
+    with profile() as profiler:
+        thread = threading.Thread(target=build)
+        thread.start()
+        thread.join()
+    assert profiler.aggregate() == {}
+
+
+def test_profiler_instance_and_kwargs_are_exclusive():
+    with pytest.raises(TypeError):
+        with profile(Profiler(), trace_memory=True):
+            pass
+
+
+def test_tracing_outlives_concurrent_profiles():
+    first_done = threading.Event()
+    second_entered = threading.Event()
+    results = {}
+
+    def first():
+        with profile(trace_memory=True):
+            second_entered.wait()
+        first_done.set()
+
+    def second():
+        with profile(trace_memory=True) as profiler:
+            second_entered.set()
+            first_done.wait()
+            with stage('allocate'):
+                array = np.ones(2**16, dtype=np.float64)
+        results['peak_bytes'] = profiler.aggregate()['allocate']['peak_bytes']
+        results['nbytes'] = array.nbytes
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results['peak_bytes'] >= results['nbytes']
+
+
+def test_externally_started_tracing_is_not_stopped():
+    tracemalloc.start()
+    try:
+        with profile(trace_memory=True):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()